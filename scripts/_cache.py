@@ -0,0 +1,93 @@
+"""Best-effort on-disk cache for derived artifacts of input files.
+
+Entries are keyed by (absolute path, st_mtime_ns, st_size) of the source file,
+so editing the file naturally invalidates its entry. The cache is purely an
+optimisation: any I/O error is swallowed and callers fall back to recomputing.
+
+Location: $XDG_CACHE_HOME/<namespace>/ (default ~/.cache/<namespace>/).
+
+`memoize_by_identity` is the in-process counterpart for data derived from a
+parsed constitution (allowlists, compiled rules, ...).
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def cache_root() -> str:
+    return os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+
+
+def file_key(path: str) -> Tuple[str, int, int]:
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+def entry_path(namespace: str, key: Tuple[str, int, int], suffix: str = ".json") -> str:
+    digest = hashlib.blake2b("{}:{}:{}".format(*key).encode("utf-8"), digest_size=16).hexdigest()
+    return os.path.join(cache_root(), namespace, digest + suffix)
+
+
+def read_entry(entry: str) -> Optional[str]:
+    try:
+        with open(entry, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_entry(entry: str, text: str) -> None:
+    # Write to a temp file in the same directory, then rename (atomic on POSIX + Windows).
+    try:
+        d = os.path.dirname(entry)
+        os.makedirs(d, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, entry)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+    except OSError:
+        pass
+
+
+def memoize_by_identity(maxsize: int = 8) -> Callable[[Callable[[Any], T]], Callable[[Any], T]]:
+    """Memoize a one-argument function on the identity of its argument.
+
+    Meant for unhashable, long-lived inputs such as a parsed constitution. The
+    cache keeps the argument alive, so its id() cannot be reused by another
+    object while the entry exists. Do not mutate the argument after first use.
+    """
+    def decorator(fn: Callable[[Any], T]) -> Callable[[Any], T]:
+        entries: Dict[int, Tuple[Any, T]] = {}
+        lock = threading.Lock()
+
+        @functools.wraps(fn)
+        def wrapper(obj: Any) -> T:
+            hit = entries.get(id(obj))
+            if hit is not None and hit[0] is obj:
+                return hit[1]
+            result = fn(obj)
+            with lock:
+                if len(entries) >= maxsize:
+                    entries.pop(next(iter(entries)))  # evict oldest
+                entries[id(obj)] = (obj, result)
+            return result
+
+        wrapper.cache_clear = entries.clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
@@ -0,0 +1,64 @@
+"""Shared YAML loading for the constitution scripts.
+
+Prefers PyYAML's libyaml-backed `CSafeLoader` (same output as `SafeLoader`,
+several times faster) and falls back to the pure-Python loader when PyYAML was
+built without libyaml.
+
+`load_constitution_cached` additionally caches the parsed constitution as
+compact JSON on disk (see `_cache.py`) and in-process, for the short-lived
+evaluation scripts that reload the same constitution on every tool call.
+Signing/verification deliberately use the uncached `load_yaml`.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+from typing import Any, Tuple
+
+try:
+    import yaml  # pyyaml
+except ImportError as e:
+    raise SystemExit("Missing dependency: pyyaml. Install with: pip install pyyaml") from e
+
+import _cache
+
+
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+CACHE_NAMESPACE = "openclaw"
+
+
+def load_yaml(path: str) -> Any:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=YAML_LOADER)
+
+
+def load_constitution_cached(path: str) -> Any:
+    """Load a constitution, reusing a cached parse while the file is unchanged.
+
+    The returned object is shared between callers; treat it as read-only.
+    """
+    return _load_constitution(_cache.file_key(path))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_constitution(key: Tuple[str, int, int]) -> Any:
+    entry = _cache.entry_path(CACHE_NAMESPACE, key)
+    text = _cache.read_entry(entry)
+    if text is not None:
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass  # corrupt entry; re-parse and overwrite
+
+    data = load_yaml(key[0])
+    # Keys keep document order (not sorted): rule/obligation order is visible in output.
+    try:
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    except (TypeError, ValueError):
+        return data  # not JSON-representable (e.g. YAML timestamps); don't cache
+    # JSON silently stringifies non-str keys; only cache lossless round-trips.
+    if json.loads(text) == data:
+        _cache.write_entry(entry, text)
+    return data
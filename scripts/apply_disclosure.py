@@ -20,20 +20,26 @@ Output:
 from __future__ import annotations
 
 import argparse
+import os
 import re
 import sys
+from pathlib import Path
 from typing import Any, Dict, Optional
 
-try:
-    import yaml  # pyyaml
-except ImportError as e:
-    raise SystemExit("Missing dependency: pyyaml. Install with: pip install pyyaml") from e
+# Ensure sibling imports work when executed as a script.
+sys.path.insert(0, os.path.dirname(__file__))
+
+from _cache import memoize_by_identity
+from _yaml_utils import load_constitution_cached
 
 
 AI_DISCLOSURE_HINT = re.compile(r"\b(ai|assistant|bot)\b", re.I)
 
 
+@memoize_by_identity()
 def load_disclosure(constitution: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    # Memoized per constitution object: a Gateway keeping the constitution loaded
+    # skips the rule scan on every outbound message. Treat the result as read-only.
     for rule in constitution.get("rules", []) or []:
         if rule.get("id") == "amendment-I-transparency":
             req = rule.get("require") or {}
@@ -72,11 +78,11 @@ def main() -> int:
     ap.add_argument("--message-file", default=None)
     ns = ap.parse_args()
 
-    constitution = yaml.safe_load(open(ns.constitution, "r", encoding="utf-8").read())
+    constitution = load_constitution_cached(ns.constitution)
     disclosure = load_disclosure(constitution)
 
     if ns.message_file:
-        msg = open(ns.message_file, "r", encoding="utf-8").read()
+        msg = Path(ns.message_file).read_text(encoding="utf-8")
     elif ns.message is not None:
         msg = ns.message
     else:
@@ -5,26 +5,59 @@ Usage:
 
 Rules:
 - YAML parse
-- Recursively sort dict keys
+- Recursively sort dict keys (json's sort_keys=True, done in C at encode time)
 - Emit compact JSON (UTF-8)
+
+`canonical_json` and `canonical_hash` are shared with sign.py / verify.py so every
+tool hashes exactly the same bytes.
 """
 
 import json
+import os
 import sys
 from typing import Any
 
-try:
-    import yaml  # pyyaml
-except ImportError as e:
-    raise SystemExit("Missing dependency: pyyaml. Install with: pip install pyyaml") from e
+# Ensure sibling imports work when executed as a script.
+sys.path.insert(0, os.path.dirname(__file__))
+
+from _yaml_utils import load_yaml
+
+
+# separators remove whitespace for stable bytes
+_C14N_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
 
+def canonical_json(obj: Any) -> str:
+    return _C14N_ENCODER.encode(obj)
 
-def sort_keys(obj: Any) -> Any:
-    if isinstance(obj, dict):
-        return {k: sort_keys(obj[k]) for k in sorted(obj.keys())}
-    if isinstance(obj, list):
-        return [sort_keys(x) for x in obj]
-    return obj
+
+def _c14n_dumps(obj: Any) -> bytes:
+    return _C14N_ENCODER.encode(obj).encode("utf-8")
+
+
+def canonical_hash(obj: Any, h: Any, depth: int = 2) -> None:
+    # Feed canonical_json(obj) into hash `h` without materializing the whole document.
+    # The top `depth` container levels are walked here; each subtree below that
+    # (e.g. one rule) is encoded by the C json encoder, so peak memory is one subtree
+    # and the bytes are identical to canonical_json(obj).
+    if depth and isinstance(obj, dict) and all(isinstance(k, str) for k in obj):
+        h.update(b"{")
+        for i, k in enumerate(sorted(obj)):
+            if i:
+                h.update(b",")
+            h.update(_c14n_dumps(k))
+            h.update(b":")
+            canonical_hash(obj[k], h, depth - 1)
+        h.update(b"}")
+    elif depth and isinstance(obj, list):
+        h.update(b"[")
+        for i, v in enumerate(obj):
+            if i:
+                h.update(b",")
+            canonical_hash(v, h, depth - 1)
+        h.update(b"]")
+    else:
+        h.update(_c14n_dumps(obj))
 
 
 def main() -> int:
@@ -33,12 +66,8 @@ def main() -> int:
         return 2
 
     path = sys.argv[1]
-    with open(path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
-
-    data = sort_keys(data)
-    # separators remove whitespace for stable bytes
-    sys.stdout.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+    data = load_yaml(path)
+    sys.stdout.write(canonical_json(data))
     return 0
 
 
@@ -19,33 +19,55 @@ import json
 import os
 import re
 import sys
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Set
+from pathlib import Path
+from typing import AbstractSet, Any, Dict, FrozenSet, List, Optional, Set, Tuple
 
 # Ensure sibling imports work when executed as a script.
 sys.path.insert(0, os.path.dirname(__file__))
 
-try:
-    import yaml  # pyyaml
-except ImportError as e:
-    raise SystemExit("Missing dependency: pyyaml. Install with: pip install pyyaml") from e
-
+from _cache import memoize_by_identity
+from _yaml_utils import load_constitution_cached
 from risk import Context as RiskContext, Risk, classify as classify_risk
 
 
-@dataclass
 class Classified:
-    risk: Risk
-    tags: Set[str]
-    details: Dict[str, Any]
+    # Plain __slots__ class (not a dataclass): built once per tool call on the hot path.
+    # `tags` is unordered and duplicate-free; callers sort it for output.
+    __slots__ = ("risk", "tags", "details")
+
+    def __init__(self, risk: Risk, tags: List[str], details: Dict[str, Any]) -> None:
+        self.risk = risk
+        self.tags = tags
+        self.details = details
+
+    def __repr__(self) -> str:
+        return f"Classified(risk={self.risk!r}, tags={self.tags!r}, details={self.details!r})"
 
 
-def _get_allowlist_domains(constitution: Optional[Dict[str, Any]]) -> List[str]:
+@memoize_by_identity()
+def _get_allowlist_domains(constitution: Optional[Dict[str, Any]]) -> Tuple[Tuple[str, ...], FrozenSet[str]]:
+    # (declared order for audit details, set for matching); built once per constitution.
     if not constitution:
-        return []
+        return (), frozenset()
     egress = constitution.get("egress") or {}
-    domains = egress.get("allowlist_domains") or []
-    return [str(d).lower() for d in domains]
+    domains = tuple(str(d).lower() for d in egress.get("allowlist_domains") or [])
+    return domains, frozenset(domains)
+
+
+def _domain_allowed(domain: str, allowed: FrozenSet[str]) -> bool:
+    # Exact entry, or `domain.endswith("." + entry)`: walk the suffixes after each "."
+    # ("a.b.com" -> "b.com", "com") so matching costs O(labels) lookups, not O(allowlist).
+    if domain in allowed:
+        return True
+    i = domain.find(".")
+    while i != -1:
+        if domain[i + 1:] in allowed:
+            return True
+        i = domain.find(".", i + 1)
+    return False
+
+
+URL_HOST_RE = re.compile(r"^https?://([^/]+)", re.I)
 
 
 def _extract_domains_from_args(tool: str, args: Dict[str, Any]) -> List[str]:
@@ -53,7 +75,7 @@ def _extract_domains_from_args(tool: str, args: Dict[str, Any]) -> List[str]:
     domains: List[str] = []
 
     def add_from_url(url: str):
-        m = re.match(r"^https?://([^/]+)", url.strip(), re.I)
+        m = URL_HOST_RE.match(url.strip())
         if m:
             domains.append(m.group(1).lower())
 
@@ -74,17 +96,35 @@ def _extract_domains_from_args(tool: str, args: Dict[str, Any]) -> List[str]:
     return domains
 
 
-IMPERSONATION_PATTERNS = [
-    re.compile(r"\bthis is\s+([A-Z][a-z]+)\b"),
-    re.compile(r"\bi am\s+([A-Z][a-z]+)\b"),
-    re.compile(r"\bfrom\s+([A-Z][a-z]+)\b"),
-]
+# Identity claims ("this is X", "i am X", "from X") as one alternation: a single scan per message.
+IMPERSONATION_RE = re.compile(r"\b(?:this is|i am|from)\s+([A-Z][a-z]+)\b")
 
 AI_DISCLOSURE_HINT = re.compile(r"\b(ai|assistant|bot)\b", re.I)
 
+REPUTATIONAL_HARM_RE = re.compile(r"\b(defame|ruin|expose|leak|doxx)\b", re.I)
+
+EXEC_HARM_RE = re.compile(r"\b(rm\s+-rf|del\s+/s|format\b)\b", re.I)
+
+# Tags promoted to `constitutionally_prohibited`.
+PROHIBITED_TAGS = frozenset({"impersonation", "harm_financial", "harm_physical", "harm_reputational"})
 
-def classify(tool: str, args: Dict[str, Any], *, constitution: Optional[Dict[str, Any]] = None, session_kind: str = "main", intent: Optional[Dict[str, Any]] = None) -> Classified:
+
+@memoize_by_identity()
+def interesting_tags(constitution: Dict[str, Any]) -> FrozenSet[str]:
+    """Tags any rule can match on (`when.classification_any_of`), for `classify(interesting=...)`."""
     tags: Set[str] = set()
+    for rule in constitution.get("rules") or []:
+        tags.update(str(t) for t in (rule.get("when") or {}).get("classification_any_of") or [])
+    if "constitutionally_prohibited" in tags:
+        tags |= PROHIBITED_TAGS
+    return frozenset(tags)
+
+
+def classify(tool: str, args: Dict[str, Any], *, constitution: Optional[Dict[str, Any]] = None, session_kind: str = "main", intent: Optional[Dict[str, Any]] = None, interesting: Optional[AbstractSet[str]] = None) -> Classified:
+    # `interesting` (see interesting_tags) skips the regex/domain detectors whose tags no
+    # rule references; their tags and details are then absent. None runs every detector.
+    # A list, not a set: each detector adds at most one distinct tag, and there are only a few.
+    tags: List[str] = []
     details: Dict[str, Any] = {}
 
     risk = classify_risk(RiskContext(tool=tool, args=args, session_kind=session_kind, intent=intent))
@@ -92,7 +132,7 @@ def classify(tool: str, args: Dict[str, Any], *, constitution: Optional[Dict[str
     # Hidden action: if this tool call wasn't explicitly requested/approved.
     # Convention: intent.user_requested == True means user directly asked for it.
     if intent is not None and intent.get("user_requested") is False:
-        tags.add("hidden_action")
+        tags.append("hidden_action")
 
     # Path privacy
     if tool in ("read", "write", "edit"):
@@ -102,44 +142,45 @@ def classify(tool: str, args: Dict[str, Any], *, constitution: Optional[Dict[str
             # If caller provides a workspace prefix in intent, we can flag unauthorized reads.
             workspace = (intent or {}).get("workspace")
             if isinstance(workspace, str) and not p.lower().startswith(workspace.lower()):
-                tags.add("unauthorized_file_access")
+                tags.append("unauthorized_file_access")
 
     # Egress allowlist (domain-scoped tools)
-    allowlist = _get_allowlist_domains(constitution)
-    domains = _extract_domains_from_args(tool, args)
-    if domains:
-        details["domains"] = domains
-        if allowlist:
-            details["allowlist_domains"] = allowlist
-            for d in domains:
-                if d not in allowlist and not any(d.endswith("." + a) for a in allowlist):
-                    tags.add("unauthorized_egress")
+    if interesting is None or "unauthorized_egress" in interesting:
+        allowlist, allowed = _get_allowlist_domains(constitution)
+        domains = _extract_domains_from_args(tool, args)
+        if domains:
+            details["domains"] = domains
+            if allowlist:
+                details["allowlist_domains"] = list(allowlist)
+                if not all(_domain_allowed(d, allowed) for d in domains):
+                    tags.append("unauthorized_egress")
 
     # Messaging deception/impersonation heuristics
-    if tool in ("message.send", "message.broadcast"):
+    want_impersonation = interesting is None or "impersonation" in interesting
+    want_reputational = interesting is None or "harm_reputational" in interesting
+    if tool in ("message.send", "message.broadcast") and (want_impersonation or want_reputational):
         msg = str(args.get("message") or "")
         if msg:
             details["message_len"] = len(msg)
             # If message claims identity without AI disclosure, flag impersonation.
-            claims = any(p.search(msg) for p in IMPERSONATION_PATTERNS)
-            has_disclosure = bool(AI_DISCLOSURE_HINT.search(msg))
-            if claims and not has_disclosure:
-                tags.add("impersonation")
+            # (disclosure hint is only scanned for when a claim was found)
+            if want_impersonation and IMPERSONATION_RE.search(msg) and not AI_DISCLOSURE_HINT.search(msg):
+                tags.append("impersonation")
 
             # Simple reputational-harm heuristic (expand as needed)
-            if re.search(r"\b(defame|ruin|expose|leak|doxx)\b", msg, re.I):
-                tags.add("harm_reputational")
+            if want_reputational and REPUTATIONAL_HARM_RE.search(msg):
+                tags.append("harm_reputational")
 
     # Exec harm heuristics
-    if tool == "exec":
+    if tool == "exec" and (interesting is None or "harm_financial" in interesting):
         cmd = " ".join(args.get("command", [])) if isinstance(args.get("command"), list) else str(args.get("command", ""))
         details["command"] = cmd
-        if re.search(r"\b(rm\s+-rf|del\s+/s|format\b)\b", cmd, re.I):
-            tags.add("harm_financial")
+        if EXEC_HARM_RE.search(cmd):
+            tags.append("harm_financial")
 
     # Promote certain tags to constitutional prohibition
-    if tags.intersection({"impersonation", "harm_financial", "harm_physical", "harm_reputational"}):
-        tags.add("constitutionally_prohibited")
+    if not PROHIBITED_TAGS.isdisjoint(tags):
+        tags.append("constitutionally_prohibited")
 
     return Classified(risk=risk, tags=tags, details=details)
 
@@ -155,7 +196,7 @@ def main() -> int:
     ns = ap.parse_args()
 
     if ns.args_file:
-        args = json.loads(open(ns.args_file, "r", encoding="utf-8").read())
+        args = json.loads(Path(ns.args_file).read_text(encoding="utf-8"))
     elif ns.args_json:
         args = json.loads(ns.args_json)
     else:
@@ -163,7 +204,7 @@ def main() -> int:
         return 2
     constitution = None
     if ns.constitution:
-        constitution = yaml.safe_load(open(ns.constitution, "r", encoding="utf-8").read())
+        constitution = load_constitution_cached(ns.constitution)
     intent = json.loads(ns.intent) if ns.intent else None
 
     out = classify(ns.tool, args, constitution=constitution, session_kind=ns.session_kind, intent=intent)
@@ -14,6 +14,7 @@ Usage:
 
 Notes:
 - Rules are evaluated deterministically.
+- Rules are compiled once per constitution object (`compile_constitution`).
 - Decision lattice: deny > confirm > allow
 - Two-pass evaluation to support rules that match on `when.decision`.
 """
@@ -25,18 +26,19 @@ import hashlib
 import json
 import os
 import sys
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
 
 # Ensure sibling imports work when executed as a script.
 sys.path.insert(0, os.path.dirname(__file__))
 
-try:
-    import yaml  # pyyaml
-except ImportError as e:
-    raise SystemExit("Missing dependency: pyyaml. Install with: pip install pyyaml") from e
-
-from classify import classify as classify_tags
+from _cache import memoize_by_identity
+from _yaml_utils import load_constitution_cached
+from c14n import canonical_json
+from classify import classify as classify_tags, interesting_tags
+from risk import Risk
 
 
 ORDER = {"allow": 0, "confirm": 1, "deny": 2}
@@ -44,34 +46,47 @@ ORDER = {"allow": 0, "confirm": 1, "deny": 2}
 
 def c14n_json(obj: Any) -> bytes:
     # Deterministic JSON encoding with sorted keys.
-    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return canonical_json(obj).encode("utf-8")
+
+
+def compute_scope_hash(tool: str, args: Any, constitution_doc_hash: Any, policy_engine_version: str) -> str:
+    # sha256 of c14n_json({"tool", "args", "constitution_doc_hash", "policy_engine_version"}).
+    # The four keys are fixed, so they are emitted pre-sorted and only the values are encoded.
+    h = hashlib.sha256()
+    h.update(b'{"args":')
+    h.update(c14n_json(args))
+    h.update(b',"constitution_doc_hash":')
+    h.update(c14n_json(constitution_doc_hash))
+    h.update(b',"policy_engine_version":')
+    h.update(c14n_json(policy_engine_version))
+    h.update(b',"tool":')
+    h.update(c14n_json(tool))
+    h.update(b"}")
+    return "sha256:" + h.hexdigest()
 
 
 def max_decision(a: str, b: str) -> str:
     return a if ORDER[a] >= ORDER[b] else b
 
 
-def risk_ge(risk: str, at_least: str) -> bool:
-    levels = ["low", "medium", "high", "critical"]
-    return levels.index(risk) >= levels.index(at_least)
+_RISK_IDX = {r.name: int(r) for r in Risk}
 
 
-def tool_matches(tool: str, matcher: Any) -> bool:
-    if matcher == "*":
-        return True
-    return tool == matcher
+def risk_ge(risk: str, at_least: str) -> bool:
+    return _RISK_IDX[risk] >= _RISK_IDX[at_least]
 
 
-def path_prefix_any(path: Optional[str], prefixes: List[str], env: Dict[str, str]) -> bool:
+def path_prefix_any(path: Optional[str], prefixes: Sequence[str], env: Dict[str, str]) -> bool:
     if not path or not isinstance(path, str):
         return False
-    p = path
+    p = path.lower()  # once, not per prefix
     # Simple ${WORKSPACE} substitution.
     for pref in prefixes:
         pref_s = str(pref)
-        for k, v in env.items():
-            pref_s = pref_s.replace("${" + k + "}", v)
-        if p.lower().startswith(pref_s.lower()):
+        if "${" in pref_s:
+            for k, v in env.items():
+                pref_s = pref_s.replace("${" + k + "}", v)
+        if p.startswith(pref_s.lower()):
             return True
     return False
 
@@ -87,83 +102,147 @@ class EvalResult:
 
 def merge_obligations(dst: Dict[str, Any], src: Dict[str, Any]) -> Dict[str, Any]:
     # Shallow merge with dict union; for nested dicts, merge recursively.
-    for k, v in (src or {}).items():
-        if k in dst and isinstance(dst[k], dict) and isinstance(v, dict):
-            dst[k] = merge_obligations(dst[k], v)
-        else:
-            dst[k] = v
+    # Iterative (work queue instead of recursion) and copy-on-insert: nested dicts from
+    # `src` are rebuilt in `dst`, so merging never mutates the (cached) constitution.
+    work = deque([(dst, src or {})])
+    while work:
+        d, s = work.popleft()
+        for k, v in s.items():
+            if isinstance(v, dict):
+                cur = d.get(k)
+                if not isinstance(cur, dict):
+                    cur = d[k] = {}
+                work.append((cur, v))
+            else:
+                d[k] = v
     return dst
 
 
-def match_when(rule_when: Dict[str, Any], *, tool: str, risk: str, classifications: List[str], decision: str) -> bool:
-    if not rule_when:
-        return True
+@dataclass(frozen=True)
+class CompiledRule:
+    """A rule with its `when` matcher lowered to pre-typed fields (None = no constraint)."""
 
-    if "tool" in rule_when and not tool_matches(tool, rule_when["tool"]):
-        return False
+    id: str
+    tools: Optional[FrozenSet[str]]  # when.tool (unless "*") and when.tool_any_of
+    risk_at_least: Optional[Risk]
+    classification_any_of: Optional[FrozenSet[str]]
+    decision: Optional[str]
+    allow_if_prefixes: Optional[Tuple[str, ...]]  # allow_if.path_prefix_any
+    otherwise_action: str
+    require: Optional[Dict[str, Any]]
+    allow_override: Optional[Dict[str, Any]]
+    action: str
 
-    if "tool_any_of" in rule_when and tool not in [str(x) for x in rule_when["tool_any_of"]]:
-        return False
-
-    if "risk_at_least" in rule_when and not risk_ge(risk, str(rule_when["risk_at_least"])):
-        return False
-
-    if "classification_any_of" in rule_when:
-        wanted = set(str(x) for x in rule_when["classification_any_of"])
-        if not wanted.intersection(classifications):
+    def matches(self, *, tool: str, risk: Risk, classifications: List[str], decision: str) -> bool:
+        if self.tools is not None and tool not in self.tools:
             return False
-
-    if "decision" in rule_when and str(rule_when["decision"]) != decision:
-        return False
-
-    return True
+        if self.risk_at_least is not None and risk < self.risk_at_least:
+            return False
+        if self.classification_any_of is not None and self.classification_any_of.isdisjoint(classifications):
+            return False
+        if self.decision is not None and self.decision != decision:
+            return False
+        return True
 
 
-def evaluate_rules(constitution: Dict[str, Any], *, tool: str, args: Dict[str, Any], risk: str, classifications: List[str], decision: str, env: Dict[str, str]) -> Tuple[str, Dict[str, Any], List[str], Optional[str]]:
+def compile_rule(rule: Dict[str, Any]) -> CompiledRule:
+    when = rule.get("when") or {}
+
+    tools: Optional[FrozenSet[str]] = None
+    if "tool" in when and when["tool"] != "*":
+        matcher = when["tool"]
+        tools = frozenset([matcher]) if isinstance(matcher, str) else frozenset()
+    if "tool_any_of" in when:
+        any_of = frozenset(str(x) for x in when["tool_any_of"])
+        tools = any_of if tools is None else tools & any_of
+
+    risk_at_least: Optional[Risk] = None
+    if "risk_at_least" in when:
+        level = str(when["risk_at_least"])
+        if level not in Risk.__members__:
+            raise ValueError(f"rule {rule.get('id')!r}: unknown risk_at_least {level!r}")
+        risk_at_least = Risk[level]
+
+    classification_any_of = None
+    if "classification_any_of" in when:
+        classification_any_of = frozenset(str(x) for x in when["classification_any_of"])
+
+    allow_if_prefixes = None
+    if "allow_if" in rule:
+        allow_if = rule.get("allow_if") or {}
+        if "path_prefix_any" in allow_if:
+            allow_if_prefixes = tuple(str(x) for x in allow_if["path_prefix_any"])
+
+    require = rule.get("require")
+    allow_override = rule.get("allow_override")
+
+    return CompiledRule(
+        id=str(rule.get("id") or ""),
+        tools=tools,
+        risk_at_least=risk_at_least,
+        classification_any_of=classification_any_of,
+        decision=str(when["decision"]) if "decision" in when else None,
+        allow_if_prefixes=allow_if_prefixes,
+        otherwise_action=str((rule.get("otherwise") or {}).get("action") or "confirm"),
+        require=require if isinstance(require, dict) else None,
+        allow_override={"allow_override": allow_override} if isinstance(allow_override, dict) else None,
+        action=str(rule.get("action") or "allow"),
+    )
+
+
+@memoize_by_identity(maxsize=4)
+def compile_constitution(constitution: Dict[str, Any]) -> Tuple[CompiledRule, ...]:
+    # Lowered once per constitution object; the Gateway hook reuses it for every call.
+    return tuple(compile_rule(rule) for rule in constitution.get("rules") or [])
+
+
+@memoize_by_identity()
+def decision_gated_rules(constitution: Dict[str, Any]) -> Tuple[CompiledRule, ...]:
+    # Rules that match on `when.decision` (the only ones pass 2 can treat differently).
+    return tuple(r for r in compile_constitution(constitution) if r.decision is not None)
+
+
+def evaluate_rules(constitution: Dict[str, Any], *, tool: str, args: Dict[str, Any], risk: Risk, classifications: List[str], decision: str, env: Dict[str, str]) -> Tuple[str, Dict[str, Any], List[str], Optional[str]]:
     out_decision = decision
     obligations: Dict[str, Any] = {}
     matched: List[str] = []
     reason_code: Optional[str] = None
 
-    rules = constitution.get("rules") or []
+    for rule in compile_constitution(constitution):
+        rid = rule.id
 
-    for rule in rules:
-        rid = str(rule.get("id") or "")
-        when = rule.get("when") or {}
-
-        if not match_when(when, tool=tool, risk=risk, classifications=classifications, decision=out_decision):
+        if not rule.matches(tool=tool, risk=risk, classifications=classifications, decision=out_decision):
             continue
 
         matched.append(rid)
 
         # allow_if / otherwise gating (minimal support)
-        if "allow_if" in rule:
-            allow_if = rule.get("allow_if") or {}
+        if rule.allow_if_prefixes is not None:
             # path-based allowlist for read/write/edit
             p = args.get("path") or args.get("file_path")
-            if "path_prefix_any" in allow_if:
-                ok = path_prefix_any(p if isinstance(p, str) else None, list(allow_if["path_prefix_any"]), env)
-                if not ok:
-                    otherwise = rule.get("otherwise") or {}
-                    act = str(otherwise.get("action") or "confirm")
-                    out_decision = max_decision(out_decision, act)
-                    if act == "deny" and reason_code is None:
-                        reason_code = rid
-                    if act == "confirm" and reason_code is None and ORDER[out_decision] == ORDER["confirm"]:
-                        reason_code = rid
-                    continue
+            ok = path_prefix_any(p if isinstance(p, str) else None, rule.allow_if_prefixes, env)
+            if not ok:
+                act = rule.otherwise_action
+                if ORDER[act] > ORDER[out_decision]:
+                    out_decision = act
+                if act == "deny" and reason_code is None:
+                    reason_code = rid
+                if act == "confirm" and reason_code is None and ORDER[out_decision] == ORDER["confirm"]:
+                    reason_code = rid
+                continue
 
         # obligations
-        if "require" in rule and isinstance(rule["require"], dict):
-            merge_obligations(obligations, rule["require"])
+        if rule.require is not None:
+            merge_obligations(obligations, rule.require)
 
         # allow_override
-        if "allow_override" in rule and isinstance(rule["allow_override"], dict):
-            merge_obligations(obligations, {"allow_override": rule["allow_override"]})
+        if rule.allow_override is not None:
+            merge_obligations(obligations, rule.allow_override)
 
         # decision
-        act = str(rule.get("action") or "allow")
-        out_decision = max_decision(out_decision, act)
+        act = rule.action
+        if ORDER[act] > ORDER[out_decision]:
+            out_decision = act
 
         if reason_code is None and act in ("deny", "confirm"):
             reason_code = rid
@@ -184,19 +263,19 @@ def main() -> int:
     ap.add_argument("--policy-engine-version", default="phase1-ref-eval-1")
     ns = ap.parse_args()
 
-    constitution = yaml.safe_load(open(ns.constitution, "r", encoding="utf-8").read())
+    constitution = load_constitution_cached(ns.constitution)
     tool = ns.tool
 
     if not ns.args and not ns.args_file:
         raise SystemExit("Missing --args or --args-file")
 
     if ns.args_file:
-        args = json.loads(open(ns.args_file, "r", encoding="utf-8").read())
+        args = json.loads(Path(ns.args_file).read_text(encoding="utf-8"))
     else:
         args = json.loads(ns.args)
 
     if ns.intent_file:
-        intent = json.loads(open(ns.intent_file, "r", encoding="utf-8").read())
+        intent = json.loads(Path(ns.intent_file).read_text(encoding="utf-8"))
     else:
         intent = json.loads(ns.intent) if ns.intent else None
 
@@ -205,8 +284,9 @@ def main() -> int:
         env["WORKSPACE"] = ns.workspace
 
     # Compute risk + tags
-    classified = classify_tags(tool, args, constitution=constitution, session_kind=ns.session_kind, intent=intent)
-    risk = classified.risk.name
+    # Only run the detectors whose tags some rule can match on.
+    classified = classify_tags(tool, args, constitution=constitution, session_kind=ns.session_kind, intent=intent, interesting=interesting_tags(constitution))
+    risk = classified.risk
     classifications = sorted(classified.tags)
 
     # Start from defaults
@@ -218,11 +298,19 @@ def main() -> int:
     decision1, obligations1, matched1, reason1 = evaluate_rules(constitution, tool=tool, args=args, risk=risk, classifications=classifications, decision=decision, env=env)
 
     # Pass 2: re-evaluate now that decision is known (enables when.decision rules like human override).
-    decision2, obligations2, matched2, reason2 = evaluate_rules(constitution, tool=tool, args=args, risk=risk, classifications=classifications, decision=decision1, env=env)
+    # Deny is the top of the lattice: after a pass-1 deny, pass 2 only replays the ungated
+    # rules pass 1 already applied, unless a rule is gated on `when.decision: deny` or a
+    # decision-gated rule matched in pass 1 (the replay could overwrite its obligations).
+    gated = decision_gated_rules(constitution)
+    if decision1 == "deny" and not any(r.decision == "deny" or r.id in matched1 for r in gated):
+        decision2, obligations2, matched2, reason2 = decision1, {}, [], None
+    else:
+        decision2, obligations2, matched2, reason2 = evaluate_rules(constitution, tool=tool, args=args, risk=risk, classifications=classifications, decision=decision1, env=env)
 
     final_decision = max_decision(decision1, decision2)
-    obligations = {}
-    merge_obligations(obligations, obligations1)
+    # obligations1 is freshly built (merge copies on insert), so it is the accumulator:
+    # one merge walk instead of copying it into an empty dict first.
+    obligations = obligations1
     merge_obligations(obligations, obligations2)
 
     reason_code = reason1 or reason2
@@ -230,22 +318,17 @@ def main() -> int:
     # Scope hash for CONFIRM
     scope_hash = None
     if final_decision == "confirm":
-        payload = {
-            "tool": tool,
-            "args": args,
-            "constitution_doc_hash": constitution.get("doc_hash"),
-            "policy_engine_version": ns.policy_engine_version,
-        }
-        scope_hash = "sha256:" + hashlib.sha256(c14n_json(payload)).hexdigest()
+        scope_hash = compute_scope_hash(tool, args, constitution.get("doc_hash"), ns.policy_engine_version)
 
     out = {
         "decision": final_decision,
         "reason_code": reason_code,
-        "risk": risk,
+        "risk": risk.name,
         "classifications": classifications,
         "obligations": obligations,
         "scope_hash": scope_hash,
-        "matched_rules": sorted(set(matched1 + matched2)),
+        # Sorted rule ids are part of the audit output; union the passes without concatenating.
+        "matched_rules": sorted(set(matched1).union(matched2)),
     }
 
     print(json.dumps(out, ensure_ascii=False, indent=2))
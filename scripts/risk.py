@@ -18,9 +18,10 @@ The design goal is **predictability** and **auditability**, not cleverness.
 
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
 from enum import IntEnum
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional
 
 
 class Risk(IntEnum):
@@ -59,6 +60,38 @@ SENSITIVE_PATH_HINTS = [
     "\\AppData\\", "\\.ssh\\", "id_rsa", "id_ed25519", "password", "secrets", "token",
 ]
 
+EXEC_NETWORK_HINTS = ["curl ", "wget ", "Invoke-WebRequest", "scp ", "ssh "]
+EXEC_DELETE_HINTS = ["rm ", "rmdir", "del ", "format", ":(){"]
+
+
+def _any_substring_re(hints: Iterable[str]) -> re.Pattern:
+    # One case-insensitive pattern: a single C-level scan instead of N `in` tests on a
+    # lowered copy. Hints are merged into a prefix trie first ("id_rsa|id_ed25519" ->
+    # "id_(?:ed25519|rsa)"), so at each position shared prefixes are tried only once
+    # (stdlib stand-in for an Aho-Corasick automaton; no extra dependency).
+    trie: Dict[str, Any] = {}
+    for h in hints:
+        node = trie
+        for ch in h.lower():
+            node = node.setdefault(ch, {})
+        node[""] = {}  # end of hint
+
+    def emit(node: Dict[str, Any]) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        if "" in node:
+            # a hint ends here; longer hints sharing this prefix are optional
+            return "(?:" + "|".join(alts) + ")?"
+        return alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+
+    return re.compile(emit(trie), re.I)
+
+
+_EXEC_NET_RE = _any_substring_re(EXEC_NETWORK_HINTS)
+_EXEC_DEL_RE = _any_substring_re(EXEC_DELETE_HINTS)
+_SENSITIVE_PATH_RE = _any_substring_re(SENSITIVE_PATH_HINTS)
+
 
 @dataclass
 class Context:
@@ -77,15 +110,15 @@ def arg_risk(tool: str, args: Dict[str, Any]) -> Risk:
     if tool == "exec":
         cmd = " ".join(args.get("command", [])) if isinstance(args.get("command"), list) else str(args.get("command", ""))
         # network + deletion patterns
-        if any(x in cmd.lower() for x in ["curl ", "wget ", "Invoke-WebRequest".lower(), "scp ", "ssh "]):
+        if _EXEC_NET_RE.search(cmd):
             return Risk.critical
-        if any(x in cmd.lower() for x in ["rm ", "rmdir", "del ", "format", ":(){"]):
+        if _EXEC_DEL_RE.search(cmd):
             return Risk.critical
         return Risk.high
 
     if tool in ("read", "write", "edit"):
         p = args.get("path") or args.get("file_path")
-        if isinstance(p, str) and any(h.lower() in p.lower() for h in SENSITIVE_PATH_HINTS):
+        if isinstance(p, str) and _SENSITIVE_PATH_RE.search(p):
             return Risk.high
         return Risk.medium
 
@@ -117,8 +150,11 @@ def scope_risk(session_kind: str, intent: Optional[Dict[str, Any]]) -> Risk:
 
 
 def classify(ctx: Context) -> Risk:
+    base = tool_base_risk(ctx.tool)
+    if base is Risk.critical:
+        return base  # already the maximum; skip the argument scans
     return max(
-        tool_base_risk(ctx.tool),
+        base,
         arg_risk(ctx.tool, ctx.args),
         egress_risk(ctx.tool, ctx.args),
         scope_risk(ctx.session_kind, ctx.intent),
@@ -24,6 +24,9 @@ except ImportError as e:
 
 from pathlib import Path
 
+# Ensure sibling imports work when executed as a script.
+sys.path.insert(0, os.path.dirname(__file__))
+
 
 def _decode_key(s: str) -> bytes:
     s = s.strip()
@@ -50,23 +53,15 @@ def main() -> int:
         return 2
 
     yaml_path = Path(args.yaml_path)
-    # canonicalize by shelling to c14n.py would be brittle; implement minimal inline
-    try:
-        import yaml
-    except ImportError as e:
-        raise SystemExit("Missing dependency: pyyaml. Install with: pip install pyyaml") from e
-
-    def sort_keys(obj):
-        if isinstance(obj, dict):
-            return {k: sort_keys(obj[k]) for k in sorted(obj.keys())}
-        if isinstance(obj, list):
-            return [sort_keys(x) for x in obj]
-        return obj
-
-    data = yaml.safe_load(yaml_path.read_text(encoding="utf-8"))
-    c14n = json.dumps(sort_keys(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
-    doc_hash_bytes = hashlib.sha256(c14n).digest()
-    doc_hash = "sha256:" + hashlib.sha256(c14n).hexdigest()
+    # canonicalize in-process via c14n.py (shelling out would be brittle)
+    from _yaml_utils import load_yaml
+    from c14n import canonical_hash
+
+    data = load_yaml(str(yaml_path))
+    h = hashlib.sha256()
+    canonical_hash(data, h)
+    doc_hash_bytes = h.digest()
+    doc_hash = "sha256:" + h.hexdigest()
 
     sk_bytes = _decode_key(args.sk)
     signing_key = SigningKey(sk_bytes)
@@ -16,13 +16,18 @@ import argparse
 import base64
 import hashlib
 import json
+import os
 import sys
+from pathlib import Path
 
 try:
     from nacl.signing import VerifyKey
 except ImportError as e:
     raise SystemExit("Missing dependency: pynacl. Install with: pip install pynacl") from e
 
+# Ensure sibling imports work when executed as a script.
+sys.path.insert(0, os.path.dirname(__file__))
+
 
 def _decode_key(s: str) -> bytes:
     s = s.strip()
@@ -41,26 +46,17 @@ def main() -> int:
     ap.add_argument("--pk", required=True)
     args = ap.parse_args()
 
-    try:
-        import yaml
-    except ImportError as e:
-        raise SystemExit("Missing dependency: pyyaml. Install with: pip install pyyaml") from e
-
-    def sort_keys(obj):
-        if isinstance(obj, dict):
-            return {k: sort_keys(obj[k]) for k in sorted(obj.keys())}
-        if isinstance(obj, list):
-            return [sort_keys(x) for x in obj]
-        return obj
+    from _yaml_utils import load_yaml
+    from c14n import canonical_hash
 
-    with open(args.yaml_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+    data = load_yaml(args.yaml_path)
 
-    c14n = json.dumps(sort_keys(data), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
-    doc_hash_bytes = hashlib.sha256(c14n).digest()
-    doc_hash = "sha256:" + hashlib.sha256(c14n).hexdigest()
+    h = hashlib.sha256()
+    canonical_hash(data, h)
+    doc_hash_bytes = h.digest()
+    doc_hash = "sha256:" + h.hexdigest()
 
-    sig_obj = json.loads(open(args.sig, "r", encoding="utf-8").read())
+    sig_obj = json.loads(Path(args.sig).read_text(encoding="utf-8"))
     if sig_obj.get("doc_hash") != doc_hash:
         print(f"doc_hash mismatch: expected {doc_hash}, got {sig_obj.get('doc_hash')}", file=sys.stderr)
         return 1
@@ -21,46 +21,112 @@ This stub only validates presence/shape of fields and echoes them back as a
 successful verification result. Replace with a real GitTruth client.
 
 Usage:
-  python scripts/verify_gittruth_stub.py constitution.attestation.json
+  python scripts/verify_gittruth_stub.py constitution.attestation.json [--format json|text]
+
+`--format text` reports failures as a plain message on stderr instead of a
+JSON object on stdout; the success output is always the JSON above.
+
+Successful results are cached on disk (see `_cache.py`) and replayed while the
+attestation file is unchanged.
 """
 
+import argparse
 import json
+import os
+import re
 import sys
+from pathlib import Path
+from typing import Any
 
-REQUIRED = ["spec", "repo", "commit", "attestation_id", "tree_hash", "timestamp", "signature"]
+try:
+    import orjson  # optional: faster parse straight from bytes
+except ImportError:
+    orjson = None
 
+# Ensure sibling imports work when executed as a script.
+sys.path.insert(0, os.path.dirname(__file__))
 
-def main() -> int:
-    if len(sys.argv) != 2:
-        print("Usage: python scripts/verify_gittruth_stub.py <constitution.attestation.json>", file=sys.stderr)
-        return 2
+import _cache
+
+CACHE_NAMESPACE = "gittruth_stub"
+
+REQUIRED = ("spec", "repo", "commit", "attestation_id", "tree_hash", "timestamp", "signature")
+REQUIRED_SET = frozenset(REQUIRED)  # membership; REQUIRED keeps the order for messages
+
+# Success line, byte-identical to json.dumps(out, ensure_ascii=False) for values
+# that need no JSON escaping (checked with _PLAIN_VALUE_RE).
+_OK_TEMPLATE = (
+    '{"ok": true, "verified_tree_hash": "%s", "verified_commit": "%s", '
+    '"trust_root": "STUB-TRUST-ROOT", "attestation_id": "%s", "timestamp": "%s"}'
+)
+_PLAIN_VALUE_RE = re.compile(r"[A-Za-z0-9:._/+-]+")
 
-    path = sys.argv[1]
-    obj = json.loads(open(path, "r", encoding="utf-8").read())
 
-    missing = [k for k in REQUIRED if k not in obj]
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # stricter than json (e.g. >64-bit ints, NaN); let json decide and report
+    return json.loads(data)
+
+
+def emit_error(msg: str, fmt: str) -> int:
+    if fmt == "text":
+        print(msg, file=sys.stderr)
+    else:
+        print(json.dumps({"ok": False, "error": msg}))
+    return 1
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("attestation_json")
+    ap.add_argument("--format", choices=("json", "text"), default="json", help="error output format")
+    ns = ap.parse_args()
+    fmt = ns.format
+
+    path = ns.attestation_json
+    # The stub's verdict depends only on the file contents. A real verifier must
+    # not replay results like this: signature/trust-root checks have to run every time.
+    entry = _cache.entry_path(CACHE_NAMESPACE, _cache.file_key(path))
+    cached = _cache.read_entry(entry)
+    if cached is not None:
+        print(cached)
+        return 0
+
+    # Both parsers take the raw bytes, skipping a separate str decode.
+    obj = _loads(Path(path).read_bytes())
+
+    # One C-level set op against the dict's keys; non-objects keep plain `in` semantics.
+    missing = REQUIRED_SET.difference(obj if isinstance(obj, dict) else [k for k in REQUIRED if k in obj])
     if missing:
-        print(json.dumps({"ok": False, "error": f"Missing fields: {missing}"}))
-        return 1
+        missing = [k for k in REQUIRED if k in missing]
+        return emit_error(f"Missing fields: {missing}", fmt)
 
     if obj.get("spec") != "gittruth-attestation-v1":
-        print(json.dumps({"ok": False, "error": "Unsupported spec"}))
-        return 1
+        return emit_error("Unsupported spec", fmt)
 
-    if not str(obj["tree_hash"]).startswith("sha256:"):
-        print(json.dumps({"ok": False, "error": "tree_hash must be sha256:<hex>"}))
-        return 1
+    tree_hash = obj["tree_hash"]
+    if not (isinstance(tree_hash, str) and tree_hash.startswith("sha256:")):
+        return emit_error("tree_hash must be sha256:<hex>", fmt)
 
     # Stubbed success response (real implementation must verify signature + tree_hash).
-    out = {
-        "ok": True,
-        "verified_tree_hash": obj["tree_hash"],
-        "verified_commit": obj["commit"],
-        "trust_root": "STUB-TRUST-ROOT",
-        "attestation_id": obj["attestation_id"],
-        "timestamp": obj["timestamp"],
-    }
-    print(json.dumps(out, ensure_ascii=False))
+    values = (tree_hash, obj["commit"], obj["attestation_id"], obj["timestamp"])
+    if all(isinstance(v, str) and _PLAIN_VALUE_RE.fullmatch(v) for v in values):
+        line = _OK_TEMPLATE % values
+    else:
+        out = {
+            "ok": True,
+            "verified_tree_hash": tree_hash,
+            "verified_commit": obj["commit"],
+            "trust_root": "STUB-TRUST-ROOT",
+            "attestation_id": obj["attestation_id"],
+            "timestamp": obj["timestamp"],
+        }
+        line = json.dumps(out, ensure_ascii=False)
+    _cache.write_entry(entry, line)
+    print(line)
     return 0
 
 